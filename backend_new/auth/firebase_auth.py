@@ -1,46 +1,154 @@
-import firebase_admin
-from firebase_admin import credentials, auth
+"""Minimal Firebase ID token verifier (PyJWT + cached Google signing certs)"""
+import asyncio
+import hashlib
+import json
+import re
+import time
 import os
+
+import jwt
+import requests
+from cryptography.x509 import load_pem_x509_certificate
 from dotenv import load_dotenv
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 load_dotenv()
 
-# Initialize Firebase Admin SDK
-cred_path = os.getenv('FIREBASE_CRED_PATH', './serviceAccountKey.json')
-#cred_path='./serviceAccountKey.json'
-firebase_initialized = False
+# Google publishes the x509 certs used to sign Firebase ID tokens here;
+# they rotate, so we cache them and honor the Cache-Control max-age
+_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
 
-if not firebase_admin._apps:
+# Resolve the Firebase project ID (needed for audience/issuer checks).
+# Falls back to reading it out of the service account key file.
+project_id = os.getenv('FIREBASE_PROJECT_ID', '')
+if not project_id:
+    cred_path = os.getenv('FIREBASE_CRED_PATH', './serviceAccountKey.json')
     try:
         if os.path.exists(cred_path):
-            cred = credentials.Certificate(cred_path)
-            firebase_admin.initialize_app(cred)
-            firebase_initialized = True
-            print("✓ Firebase Admin SDK initialized successfully")
-        else:
-            print(f"⚠ Warning: Firebase credentials not found at {cred_path}")
-            print("  Firebase authentication will be disabled")
+            with open(cred_path, 'r', encoding='utf-8') as f:
+                project_id = json.load(f).get('project_id', '')
     except Exception as e:
-        print(f"⚠ Warning: Failed to initialize Firebase: {str(e)}")
-        print("  Firebase authentication will be disabled")
+        print(f"⚠ Warning: Failed to read service account key: {str(e)}")
+
+firebase_initialized = bool(project_id)
+if firebase_initialized:
+    print(f"✓ Firebase token verification enabled for project: {project_id}")
+else:
+    print("⚠ Warning: No Firebase project ID configured (FIREBASE_PROJECT_ID or service account key)")
+    print("  Firebase authentication will be disabled")
 
 security = HTTPBearer()
 
+# Signing certs cached by kid: {kid: public_key}, refreshed when expired
+_signing_keys = {}
+_signing_keys_expiry = 0.0
+
+
+def _get_signing_key(kid: str):
+    """Get the Google public key for a kid, refreshing the cert cache if stale"""
+    global _signing_keys, _signing_keys_expiry
+
+    if kid in _signing_keys and time.time() < _signing_keys_expiry:
+        return _signing_keys[kid]
+
+    response = requests.get(_CERTS_URL, timeout=10)
+    response.raise_for_status()
+
+    # Honor Cache-Control max-age so a miss doesn't refetch on every call
+    max_age = 3600
+    match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+    if match:
+        max_age = int(match.group(1))
+
+    _signing_keys = {
+        key_id: load_pem_x509_certificate(pem.encode()).public_key()
+        for key_id, pem in response.json().items()
+    }
+    _signing_keys_expiry = time.time() + max_age
+
+    return _signing_keys.get(kid)
+
+
+def _verify_id_token(token: str) -> dict:
+    """Verify a Firebase ID token and return the decoded claims"""
+    kid = jwt.get_unverified_header(token).get('kid')
+    if not kid:
+        raise ValueError("Token has no 'kid' header")
+
+    key = _get_signing_key(kid)
+    if key is None:
+        raise ValueError(f"No signing cert found for kid: {kid}")
+
+    decoded = jwt.decode(
+        token,
+        key,
+        algorithms=['RS256'],
+        audience=project_id,
+        issuer=f"https://securetoken.google.com/{project_id}"
+    )
+
+    if not decoded.get('sub'):
+        raise ValueError("Token has no 'sub' claim")
+    decoded['uid'] = decoded['sub']
+    return decoded
+
+
+# In-memory cache of verified tokens: sha256(token) -> (decoded, exp_timestamp)
+# Verifying an ID token costs ~50-100ms per call, so cached payloads are
+# reused until the token expires
+_token_cache = {}
+_token_locks = {}
+_CACHE_LEEWAY_SECONDS = 60
+_MAX_CACHE_ENTRIES = 10000
+
+
+def _prune_token_cache():
+    """Drop expired entries when the cache grows too large"""
+    if len(_token_cache) < _MAX_CACHE_ENTRIES:
+        return
+    now = time.time()
+    for key in [k for k, (_, exp) in _token_cache.items() if exp <= now]:
+        _token_cache.pop(key, None)
+        _token_locks.pop(key, None)
+
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     """
     Verifies the Firebase token and returns the decoded user information.
+    Verified tokens are cached in memory until expiry so repeated requests
+    skip signature verification.
     """
     if not firebase_initialized:
         # For development: return a mock user if Firebase is not initialized
         print("⚠ Warning: Using mock authentication (Firebase not initialized)")
         return {"uid": "mock_user_id", "email": "mock@example.com"}
-    
+
     token = credentials.credentials
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+
+    cached = _token_cache.get(cache_key)
+    if cached and cached[1] > time.time() - _CACHE_LEEWAY_SECONDS:
+        return cached[0]
+
+    # Per-key lock so concurrent first hits verify the token only once
+    lock = _token_locks.setdefault(cache_key, asyncio.Lock())
     try:
-        decoded = auth.verify_id_token(token)
-        return decoded  # Return decoded token (contains uid, email, etc.)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token. {str(e)}")
+        async with lock:
+            cached = _token_cache.get(cache_key)
+            if cached and cached[1] > time.time() - _CACHE_LEEWAY_SECONDS:
+                return cached[0]
+
+            try:
+                decoded = await asyncio.to_thread(_verify_id_token, token)
+            except Exception as e:
+                raise HTTPException(status_code=401, detail=f"Invalid token. {str(e)}")
 
+            _prune_token_cache()
+            _token_cache[cache_key] = (decoded, decoded.get('exp', time.time() + 3600))
+            return decoded  # Return decoded token (contains uid, email, etc.)
+    finally:
+        # Locks only matter while a cache entry exists; without this,
+        # every unique invalid token would leak a Lock forever
+        if cache_key not in _token_cache:
+            _token_locks.pop(cache_key, None)
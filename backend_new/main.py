@@ -4,13 +4,17 @@ Core features: Search, Fetch, Ask Question, Compare Papers
 Using Sentence Transformers for embeddings (no API key needed)
 """
 import os
+import asyncio
+import logging
 import math
 from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Optional, Dict, List
 
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
@@ -28,8 +32,9 @@ from models.schemas import (
 )
 
 # Services
-from services.semantic_scholar_service import SemanticScholarService
+from services.semantic_scholar_service import SemanticScholarService, close_http_client
 from services.paper_ranking_service import rank_papers
+from services.search_cache import get_cached_results, cache_results
 
 # RAG
 from rag.rag_pipeline import (
@@ -41,9 +46,48 @@ from rag.rag_pipeline import (
 )
 from rag.paper_comparison import compare_multiple_papers
 
+# Utils
+from utils.logging_utils import setup_logging
+
 load_dotenv()
 
-app = FastAPI(title="PaperLens API", version="2.1.0")
+logger = logging.getLogger("paperlens")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log records are formatted and written on a background thread so error
+    # storms never block the event loop
+    log_listener = setup_logging()
+
+    # Warm up the embedding models so the first real request doesn't pay
+    # cold-start kernel selection (oneDNN/MKL picks kernels on first batch)
+    from rag.rag_pipeline import embeddings
+    from services.paper_ranking_service import model as ranking_model
+    app.state.embeddings = embeddings
+    try:
+        await asyncio.to_thread(embeddings.model.encode, ["warmup"] * 8, batch_size=8, show_progress_bar=False)
+        if ranking_model is not embeddings.model:
+            await asyncio.to_thread(ranking_model.encode, ["warmup"] * 8, batch_size=8, show_progress_bar=False)
+        logger.info("Embedding model warmup complete")
+    except Exception as e:
+        logger.warning(f"Embedding model warmup failed: {e}")
+
+    # Indexes backing the user-scoped list endpoints (no-ops once created)
+    try:
+        await db.user_papers.create_index([("user_id", 1), ("saved_at", -1)])
+        await db.searches.create_index([("user_id", 1), ("timestamp", -1)])
+    except Exception as e:
+        logger.warning(f"Failed to create MongoDB indexes: {e}")
+    yield
+    # Close the shared HTTP client so pooled connections shut down cleanly
+    await close_http_client()
+    log_listener.stop()
+
+
+# ORJSONResponse keeps serialization of the large search/comparison
+# payloads off the slow stdlib json path
+app = FastAPI(title="PaperLens API", version="2.1.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # -----------------------
 # MongoDB Setup
@@ -93,11 +137,17 @@ async def search_papers(request: SearchRequest, decoded=Depends(verify_token)):
         raise HTTPException(status_code=400, detail="Query cannot be empty")
 
     try:
-        # Fetch papers from Semantic Scholar
-        papers = await SemanticScholarService.search_papers(query, limit=20)
+        # Serve repeated queries from the ranked-results cache (cross-user)
+        ranked_papers = await get_cached_results(query, limit=20)
+
+        if ranked_papers is None:
+            # Fetch papers from Semantic Scholar
+            papers = await SemanticScholarService.search_papers(query, limit=20)
+
+            # Rank papers by relevance using Sentence Transformers
+            ranked_papers = rank_papers(query, papers, top_k=20)
 
-        # Rank papers by relevance using Sentence Transformers
-        ranked_papers = rank_papers(query, papers, top_k=20)
+            await cache_results(query, 20, ranked_papers)
 
         # Build available filter metadata with counts
         venue_counter = Counter()
@@ -181,12 +231,15 @@ async def search_papers(request: SearchRequest, decoded=Depends(verify_token)):
         end_index = start_index + page_size
         paged_results = filtered_papers[start_index:end_index]
 
-        # Save search to user history
+        # Save search to user history (compact summary, not the full papers)
         user_id = decoded['uid']
         await db.searches.insert_one({
             "user_id": user_id,
             "query": query,
-            "results": filtered_papers,
+            "results": [
+                {"title": paper.get("title"), "url": paper.get("url")}
+                for paper in filtered_papers[:10]
+            ],
             "timestamp": datetime.now(timezone.utc).isoformat()
         })
 
@@ -212,10 +265,15 @@ async def search_papers(request: SearchRequest, decoded=Depends(verify_token)):
         }
 
     except Exception as e:
-        print(f"[ERROR] Search failed: {e}")
+        logger.exception("Search failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# In-flight /api/fetch-paper work keyed by paper_id: concurrent requests for
+# the same paper await the first request's Future instead of re-processing
+_fetch_in_flight: Dict[str, asyncio.Future] = {}
+
+
 @app.post("/api/fetch-paper")
 async def fetch_paper(request: FetchPaperRequest, decoded=Depends(verify_token)):
     """
@@ -229,21 +287,46 @@ async def fetch_paper(request: FetchPaperRequest, decoded=Depends(verify_token))
     if not pdf_url:
         raise HTTPException(status_code=400, detail="PDF URL is required")
 
-    try:
-        paper_id = get_paper_id_from_url(pdf_url)
+    paper_id = get_paper_id_from_url(pdf_url)
+
+    # Single-flight: piggyback on an identical fetch already in progress
+    in_flight = _fetch_in_flight.get(paper_id)
+    if in_flight is not None:
+        return await asyncio.shield(in_flight)
 
+    future = asyncio.get_running_loop().create_future()
+    _fetch_in_flight[paper_id] = future
+    try:
+        result = await _fetch_and_process_paper(paper_id, pdf_url, paper_title, incoming_info)
+        if not future.done():
+            future.set_result(result)
+        return result
+    except Exception as e:
+        if not future.done():
+            future.set_exception(e)
+            future.exception()  # mark retrieved for waiters that already gave up
+        raise
+    finally:
+        # If the leader died without resolving (e.g. CancelledError skips
+        # the except above), release the waiters instead of hanging them
+        if not future.done():
+            future.cancel()
+        _fetch_in_flight.pop(paper_id, None)
+
+
+async def _fetch_and_process_paper(paper_id: str, pdf_url: str, paper_title: str, incoming_info: Dict) -> Dict:
+    """Do the actual fetch/process work for one paper"""
+    try:
         # Check if paper is already processed (in memory or on disk)
-        from rag.rag_pipeline import get_or_load_vectorstore, load_metadata_from_disk
+        from rag.rag_pipeline import get_or_load_vectorstore, load_metadata_from_disk, get_source_type
         existing_vectorstore = get_or_load_vectorstore(paper_id)
-        
+
         if existing_vectorstore:
             # Paper already processed, return success without re-processing
             existing_metadata = load_metadata_from_disk(paper_id)
             if existing_metadata:
-                # Determine source type
-                test_docs = existing_vectorstore.similarity_search("test", k=1)
-                source_type = 'metadata' if test_docs and len(test_docs[0].page_content) < 1000 else 'pdf'
-                
+                source_type = get_source_type(paper_id, existing_metadata)
+
                 message = f"✅ Paper already loaded! I'm ready to answer questions about '{paper_title}'."
                 return {
                     "success": True,
@@ -264,7 +347,7 @@ async def fetch_paper(request: FetchPaperRequest, decoded=Depends(verify_token))
         }
 
         # Process paper with source priority pipeline
-        vector_store, source_type = process_paper_with_source_priority(paper_info, paper_id)
+        vector_store, source_type = await process_paper_with_source_priority(paper_info, paper_id)
 
         if vector_store:
             # User-friendly messages - don't reveal source details
@@ -289,9 +372,7 @@ async def fetch_paper(request: FetchPaperRequest, decoded=Depends(verify_token))
             }
 
     except Exception as e:
-        print(f"[ERROR] Fetch paper failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Fetch paper failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -332,9 +413,9 @@ async def ask_question(request: QuestionRequest, decoded=Depends(verify_token)):
                 "citation": result.get('citation', ''),
                 "timestamp": datetime.now(timezone.utc).isoformat()
             })
-            print(f"[SUCCESS] Saved Q&A to history for user {user_id}")
+            logger.info(f"Saved Q&A to history for user {user_id}")
         except Exception as e:
-            print(f"[WARN] Failed to save Q&A history: {e}")
+            logger.warning(f"Failed to save Q&A history: {e}")
             # Don't fail the request if history save fails
 
         # Remove confidence from response
@@ -347,9 +428,7 @@ async def ask_question(request: QuestionRequest, decoded=Depends(verify_token)):
         return response
 
     except Exception as e:
-        print(f"[ERROR] Ask question failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ask question failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -400,9 +479,7 @@ async def compare_papers(request: ComparisonRequest, decoded=Depends(verify_toke
         return response
 
     except Exception as e:
-        print(f"[ERROR] Compare papers failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Compare papers failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -429,7 +506,7 @@ async def save_paper(request: SavePaperRequest, decoded=Depends(verify_token)):
         return {"success": True, "message": "Paper saved successfully"}
 
     except Exception as e:
-        print(f"[ERROR] Save paper failed: {e}")
+        logger.exception("Save paper failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -439,13 +516,14 @@ async def get_user_papers(decoded=Depends(verify_token)):
     user_id = decoded['uid']
 
     try:
-        papers = await db.user_papers.find({"user_id": user_id}).sort("saved_at", -1).to_list(length=100)
-        for paper in papers:
-            paper['_id'] = str(paper['_id'])
+        papers = await db.user_papers.find(
+            {"user_id": user_id},
+            projection={"_id": 0, "paper": 1, "saved_at": 1}
+        ).sort("saved_at", -1).to_list(length=100)
         return {"papers": papers}
 
     except Exception as e:
-        print(f"[ERROR] Get user papers failed: {e}")
+        logger.exception("Get user papers failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -455,12 +533,13 @@ async def get_search_history(decoded=Depends(verify_token)):
     user_id = decoded['uid']
 
     try:
-        searches = await db.searches.find({"user_id": user_id}).sort("timestamp", -1).limit(20).to_list(length=20)
-        for search in searches:
-            search['_id'] = str(search['_id'])
+        searches = await db.searches.find(
+            {"user_id": user_id},
+            projection={"_id": 0, "query": 1, "results": 1, "timestamp": 1}
+        ).sort("timestamp", -1).limit(20).to_list(length=20)
         return {"searches": searches}
 
     except Exception as e:
-        print(f"[ERROR] Get search history failed: {e}")
+        logger.exception("Get search history failed")
         raise HTTPException(status_code=500, detail=str(e))
 
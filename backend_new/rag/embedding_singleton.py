@@ -0,0 +1,23 @@
+"""Process-wide shared embedding model"""
+import os
+from functools import lru_cache
+from sentence_transformers import SentenceTransformer
+from rag.embeddings import SentenceTransformerEmbeddings
+
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> SentenceTransformerEmbeddings:
+    """
+    Return the single shared embeddings wrapper.
+
+    Ranking and RAG previously each loaded their own copy of the same
+    weights; memoizing here halves model RAM and startup time.
+    """
+    return SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def get_model() -> SentenceTransformer:
+    """Return the raw SentenceTransformer behind the shared wrapper"""
+    return get_embeddings().model
@@ -4,7 +4,7 @@ from typing import List, Dict
 from langchain_google_genai import GoogleGenerativeAI
 import os
 
-from rag.rag_pipeline import vector_stores, paper_metadata
+from rag.rag_pipeline import vector_stores, paper_metadata, get_source_type, embeddings
 from utils.citation_utils import extract_citation_info
 from utils.confidence_scorer import ConfidenceScorer
 
@@ -13,7 +13,22 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable is required. Please set it in your .env file.")
 
-llm = GoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=GEMINI_API_KEY, temperature=0.3)
+llm = GoogleGenerativeAI(
+    model="gemini-2.0-flash",
+    google_api_key=GEMINI_API_KEY,
+    temperature=0.3,
+    max_retries=3,
+    timeout=30
+)
+
+# Bound concurrent FAISS retrievals (they run in threads; FAISS releases the GIL)
+_retrieval_semaphore = asyncio.Semaphore(8)
+
+
+async def _search_by_vector(vectorstore, query_embedding, k: int = 3):
+    """Run a bounded similarity search against a precomputed query embedding"""
+    async with _retrieval_semaphore:
+        return await asyncio.to_thread(vectorstore.similarity_search_by_vector, query_embedding, k)
 
 
 async def compare_multiple_papers(
@@ -46,21 +61,31 @@ async def compare_multiple_papers(
         all_source_types = []
         all_retrieval_scores = []
 
+        loaded_papers = []
         for i, paper_id in enumerate(paper_ids):
             vectorstore = vector_stores.get(paper_id)
-
             if not vectorstore:
                 continue
-
             paper_info = papers_info[i] if i < len(papers_info) else paper_metadata.get(paper_id, {})
-            citation = extract_citation_info(paper_info)
+            loaded_papers.append((paper_id, vectorstore, paper_info))
+
+        # Embed the comparison query once and run all retrievals concurrently
+        # instead of re-embedding it per paper
+        query_embedding = await embeddings.aembed_query(comparison_query)
+        retrievals = await asyncio.gather(
+            *[_search_by_vector(vectorstore, query_embedding, k=3) for _, vectorstore, _ in loaded_papers],
+            return_exceptions=True
+        )
 
-            # Determine source type
-            test_docs = vectorstore.similarity_search("test", k=1)
-            source_type = 'metadata' if test_docs and len(test_docs[0].page_content) < 1000 else 'pdf'
+        for (paper_id, vectorstore, paper_info), relevant_docs in zip(loaded_papers, retrievals):
+            if isinstance(relevant_docs, Exception):
+                print(f"[WARN] Retrieval failed for paper {paper_id}: {relevant_docs}")
+                continue
+
+            citation = extract_citation_info(paper_info)
 
-            # Retrieve relevant chunks for the comparison query
-            relevant_docs = vectorstore.similarity_search(comparison_query, k=3)
+            # Source type was stored at ingest; no probe query needed
+            source_type = get_source_type(paper_id)
 
             if relevant_docs:
                 context = "\n".join([doc.page_content for doc in relevant_docs])
@@ -128,8 +153,8 @@ Instructions:
 
 Comparison:"""
 
-        # Call Gemini for synthesis
-        response = await asyncio.to_thread(llm.invoke, prompt)
+        # Call Gemini for synthesis (native async client, no executor thread)
+        response = await llm.ainvoke(prompt)
         comparison_text = response.strip()
 
         # Calculate confidence based on sources (keep internal but don't return)
@@ -1,26 +1,32 @@
 """RAG pipeline using Sentence Transformers + Gemini LLM"""
 import os
 import asyncio
+import hashlib
+import shutil
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import faiss
+import numpy as np
+import orjson
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
 from langchain_google_genai import GoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 
-from rag.embeddings import SentenceTransformerEmbeddings
+from rag.embedding_singleton import get_embeddings
 from utils.pdf_processor import resolve_pdf_url, download_pdf, extract_text_from_pdf
+from utils.text_utils import fast_split
 from services.semantic_scholar_service import SemanticScholarService
 from services.arxiv_service import search_arxiv_for_paper, ArxivService
 from utils.confidence_scorer import ConfidenceScorer
 from utils.citation_utils import extract_citation_info
 
 # Initialize embeddings (Sentence Transformers - NO API KEY NEEDED)
-EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
-embeddings = SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL)
+# Shared with the ranking service: one copy of the weights per process
+embeddings = get_embeddings()
 
 # Initialize LLM (Gemini - requires API key from environment)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
@@ -28,14 +34,12 @@ if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable is required. Please set it in your .env file.")
 
 os.environ['GOOGLE_API_KEY'] = GEMINI_API_KEY
-llm = GoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=GEMINI_API_KEY, temperature=0.3)
-
-# Text splitter
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    length_function=len,
-    separators=["\n\n", "\n", ". ", " ", ""]
+llm = GoogleGenerativeAI(
+    model="gemini-2.0-flash",
+    google_api_key=GEMINI_API_KEY,
+    temperature=0.3,
+    max_retries=3,
+    timeout=30
 )
 
 # Persistent storage directory
@@ -48,10 +52,56 @@ METADATA_DIR.mkdir(exist_ok=True)
 vector_stores: Dict[str, FAISS] = {}
 paper_metadata: Dict[str, Dict] = {}
 
+# Static QA prompts, built once; formatted with str.format on the hot path
+# instead of constructing a PromptTemplate per question
+PDF_PROMPT = """You are PaperLens, a helpful AI research assistant. Your goal is to provide clear, understandable answers based on the research paper.
+
+CONTEXT FROM PAPER:
+{context}
+
+USER'S QUESTION:
+{question}
+
+INSTRUCTIONS:
+1. Provide a clear, well-structured answer that a general reader can understand
+2. Use simple language when possible, but maintain scientific accuracy
+3. Structure your answer with:
+   - A brief direct answer (1-2 sentences)
+   - Key points or details (2-4 bullet points or short paragraphs)
+   - Any important context or limitations
+4. When referencing the paper, use this citation: {citation}
+5. If the context doesn't fully answer the question, acknowledge this clearly
+6. Keep the answer concise but comprehensive (aim for 150-300 words)
+7. Use examples or analogies if they help explain complex concepts
+
+Answer:"""
+
+# For metadata-only, be more careful
+METADATA_PROMPT = """You are PaperLens, a helpful AI research assistant. You're answering based on the paper's abstract and title.
+
+PAPER INFORMATION:
+{context}
+
+USER'S QUESTION:
+{question}
+
+INSTRUCTIONS:
+1. Provide a helpful answer based on the available information
+2. Be clear about what you can and cannot answer given the limited information
+3. Use simple, understandable language
+4. When referencing, use this citation: {citation}
+5. Keep the answer concise (100-200 words)
+6. If the question requires details not in the abstract, politely explain this
+
+Answer:"""
+
 
 def get_paper_id_from_url(url: str) -> str:
     """Generate consistent paper ID from URL"""
-    return str(abs(hash(url)))
+    # Python's hash() is randomized per interpreter (PYTHONHASHSEED), which
+    # made the on-disk vectorstore cache miss on every restart; blake2b is
+    # stable across processes
+    return hashlib.blake2b(url.encode(), digest_size=8).hexdigest()
 
 
 def get_vectorstore_path(paper_id: str) -> Path:
@@ -68,7 +118,13 @@ def save_vectorstore_to_disk(vectorstore: FAISS, paper_id: str) -> bool:
     """Save vectorstore to disk for persistence"""
     try:
         vectorstore_path = get_vectorstore_path(paper_id)
-        vectorstore.save_local(str(vectorstore_path))
+        # Write to a temp directory and swap it in, so a crash mid-save can't
+        # leave a half-written store that poisons the disk cache on reload
+        tmp_path = vectorstore_path.with_name(f"{paper_id}.tmp")
+        vectorstore.save_local(str(tmp_path))
+        if vectorstore_path.exists():
+            shutil.rmtree(vectorstore_path, ignore_errors=True)
+        os.replace(tmp_path, vectorstore_path)
         print(f"[SUCCESS] Saved vectorstore to disk: {vectorstore_path}")
         return True
     except Exception as e:
@@ -81,7 +137,16 @@ def load_vectorstore_from_disk(paper_id: str) -> Optional[FAISS]:
     try:
         vectorstore_path = get_vectorstore_path(paper_id)
         if vectorstore_path.exists() and (vectorstore_path / "index.faiss").exists():
-            vectorstore = FAISS.load_local(str(vectorstore_path), embeddings, allow_dangerous_deserialization=True)
+            vectorstore = FAISS.load_local(
+                str(vectorstore_path),
+                embeddings,
+                allow_dangerous_deserialization=True,
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+                normalize_L2=True
+            )
+            # Re-apply the search-time width for HNSW indexes loaded from disk
+            if hasattr(vectorstore.index, 'hnsw'):
+                vectorstore.index.hnsw.efSearch = 64
             print(f"[SUCCESS] Loaded vectorstore from disk: {vectorstore_path}")
             return vectorstore
     except Exception as e:
@@ -92,10 +157,8 @@ def load_vectorstore_from_disk(paper_id: str) -> Optional[FAISS]:
 def save_metadata_to_disk(paper_id: str, paper_info: Dict) -> bool:
     """Save paper metadata to disk"""
     try:
-        import json
         metadata_path = get_metadata_path(paper_id)
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(paper_info, f, indent=2, ensure_ascii=False)
+        metadata_path.write_bytes(orjson.dumps(paper_info, option=orjson.OPT_INDENT_2))
         return True
     except Exception as e:
         print(f"[ERROR] Failed to save metadata: {e}")
@@ -105,11 +168,9 @@ def save_metadata_to_disk(paper_id: str, paper_info: Dict) -> bool:
 def load_metadata_from_disk(paper_id: str) -> Optional[Dict]:
     """Load paper metadata from disk"""
     try:
-        import json
         metadata_path = get_metadata_path(paper_id)
         if metadata_path.exists():
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return orjson.loads(metadata_path.read_bytes())
     except Exception as e:
         print(f"[WARN] Failed to load metadata: {e}")
     return None
@@ -134,12 +195,26 @@ def get_or_load_vectorstore(paper_id: str) -> Optional[FAISS]:
     return None
 
 
+def get_source_type(paper_id: str, paper_info: Optional[Dict] = None) -> str:
+    """Read the stored source type for a paper without probing the vectorstore"""
+    info = paper_info or paper_metadata.get(paper_id) or load_metadata_from_disk(paper_id) or {}
+    source_type = info.get('source_type')
+    if source_type:
+        return source_type
+
+    # Older vectorstores predate the stored field; fall back to probing once
+    vectorstore = vector_stores.get(paper_id)
+    if vectorstore:
+        test_docs = vectorstore.similarity_search("test", k=1)
+        return 'metadata' if test_docs and len(test_docs[0].page_content) < 1000 else 'pdf'
+    return 'pdf'
+
+
 def create_vectorstore_from_text(text: str, paper_id: str, paper_info: Dict) -> FAISS:
     """Create FAISS vectorstore from text using Sentence Transformers"""
-    # Split text into chunks
-    chunks = text_splitter.split_text(text)
+    # Split text into chunks (single-pass, boundary-aware)
+    chunks = fast_split(text, size=1000, overlap=200)
 
-    # Create Document objects with metadata
     documents = [
         Document(
             page_content=chunk,
@@ -154,8 +229,29 @@ def create_vectorstore_from_text(text: str, paper_id: str, paper_info: Dict) ->
         for i, chunk in enumerate(chunks)
     ]
 
-    # Create FAISS vectorstore with Sentence Transformer embeddings
-    vectorstore = FAISS.from_documents(documents, embeddings)
+    # Encode once and hand FAISS the raw numpy rows; going through
+    # embed_documents would box every vector into Python floats first
+    vectors = np.asarray(embeddings.encode(chunks), dtype=np.float32)
+    # L2-normalize so inner product == cosine; the IP kernel then skips
+    # the per-comparison norm term
+    faiss.normalize_L2(vectors)
+
+    # HNSW graph over 8-bit scalar-quantized codes: O(log N) search instead
+    # of a full scan, at ~4x less memory than flat FP32
+    index = faiss.index_factory(vectors.shape[1], "HNSW32,SQ8", faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = 200
+    index.hnsw.efSearch = 64
+    index.train(vectors)
+    index.add(vectors)
+
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(documents)}),
+        index_to_docstore_id={i: str(i) for i in range(len(documents))},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        normalize_L2=True
+    )
 
     # Save to disk for persistence
     save_vectorstore_to_disk(vectorstore, paper_id)
@@ -166,14 +262,61 @@ def create_vectorstore_from_text(text: str, paper_id: str, paper_info: Dict) ->
     return vectorstore
 
 
-def process_paper_with_source_priority(paper_info: Dict, paper_id: str) -> Tuple[Optional[FAISS], str]:
+async def _extract_viable_text(pdf_content: Optional[bytes]) -> Optional[str]:
+    """Extract text from PDF bytes, returning None if too short to be useful"""
+    if not pdf_content:
+        return None
+    text = await asyncio.to_thread(extract_text_from_pdf, pdf_content)
+    if text and len(text) > 500:
+        return text
+    return None
+
+
+async def _try_direct_pdf(paper_info: Dict, paper_url: str) -> Optional[str]:
+    """Try the PDF URL provided with the paper (or resolved from its page)"""
+    direct_pdf = paper_info.get('pdf_url') or await asyncio.to_thread(resolve_pdf_url, paper_url)
+    if not direct_pdf:
+        return None
+    pdf_content = await asyncio.to_thread(download_pdf, direct_pdf)
+    return await _extract_viable_text(pdf_content)
+
+
+async def _try_s2_pdf(paper_info: Dict, paper_url: str, title: str) -> Optional[str]:
+    """Try the open-access PDF reported by Semantic Scholar"""
+    s2_pdf_url = await SemanticScholarService.get_paper_pdf_url(
+        paper_url,
+        paper_info.get('external_ids') or paper_info.get('externalIds'),
+        title
+    )
+    if not s2_pdf_url:
+        return None
+    pdf_content = await asyncio.to_thread(download_pdf, s2_pdf_url)
+    return await _extract_viable_text(pdf_content)
+
+
+async def _try_arxiv_pdf(paper_info: Dict, title: str, authors: str) -> Optional[str]:
+    """Try finding the paper on arXiv (title search, then external IDs)"""
+    arxiv_paper = await asyncio.to_thread(search_arxiv_for_paper, title, authors)
+
+    # Check external IDs for arXiv ID
+    if not arxiv_paper:
+        ex = paper_info.get('externalIds') or paper_info.get('external_ids') or {}
+        arxiv_id = ex.get('ArXiv') or ex.get('ARXIV') or ex.get('arxiv')
+        if arxiv_id:
+            arxiv_paper = {'pdf_url': f"https://arxiv.org/pdf/{arxiv_id}.pdf"}
+
+    if not (arxiv_paper and arxiv_paper.get('pdf_url')):
+        return None
+    pdf_content = await asyncio.to_thread(ArxivService.download_pdf, arxiv_paper['pdf_url'])
+    return await _extract_viable_text(pdf_content)
+
+
+async def process_paper_with_source_priority(paper_info: Dict, paper_id: str) -> Tuple[Optional[FAISS], str]:
     """
     Process paper using source priority pipeline:
     1. Check if already processed (in memory or disk)
-    2. Direct PDF from provided URL
-    3. Semantic Scholar PDF
-    4. arXiv PDF
-    5. Metadata only
+    2. PDF sources, fetched concurrently (direct URL > Semantic Scholar > arXiv)
+    3. Metadata only
     """
     title = paper_info.get('title', '')
     authors = paper_info.get('authors', '')
@@ -188,78 +331,60 @@ def process_paper_with_source_priority(paper_info: Dict, paper_id: str) -> Tuple
         print(f"[INFO] Paper already processed, using cached vectorstore")
         existing_metadata = paper_metadata.get(paper_id) or load_metadata_from_disk(paper_id)
         if existing_metadata:
-            # Determine source type from existing metadata
-            test_docs = existing_vectorstore.similarity_search("test", k=1)
-            source_type = 'metadata' if test_docs and len(test_docs[0].page_content) < 1000 else 'pdf'
-            return existing_vectorstore, source_type
-
-    # Priority 0: Direct PDF from provided URL
-    resolved_from_url = resolve_pdf_url(paper_url)
-    direct_pdf = paper_info.get('pdf_url') or resolved_from_url
-
-    if direct_pdf:
-        pdf_content = download_pdf(direct_pdf)
-        if pdf_content:
-            text = extract_text_from_pdf(pdf_content)
-            if text and len(text) > 500:
-                vectorstore = create_vectorstore_from_text(text, paper_id, paper_info)
-                vector_stores[paper_id] = vectorstore
-                paper_metadata[paper_id] = paper_info
-                print("[SUCCESS] Processed direct PDF")
-                return vectorstore, 'pdf'
-
-    # Priority 1: Semantic Scholar PDF
-    print("[STEP 1] Trying Semantic Scholar PDF...")
-    s2_pdf_url = SemanticScholarService.get_paper_pdf_url(
-        paper_url,
-        paper_info.get('external_ids') or paper_info.get('externalIds'),
-        title
-    )
-
-    if s2_pdf_url:
-        pdf_content = download_pdf(s2_pdf_url)
-        if pdf_content:
-            text = extract_text_from_pdf(pdf_content)
-            if text and len(text) > 500:
-                vectorstore = create_vectorstore_from_text(text, paper_id, paper_info)
-                vector_stores[paper_id] = vectorstore
-                paper_metadata[paper_id] = paper_info
-                print("[SUCCESS] Processed Semantic Scholar PDF")
-                return vectorstore, 'pdf'
+            return existing_vectorstore, get_source_type(paper_id, existing_metadata)
+
+    # Try all PDF sources concurrently; the first viable text wins, with a
+    # priority tiebreaker (direct > Semantic Scholar > arXiv) when several
+    # finish before we decide. Worst-case latency drops from the sum of the
+    # per-source timeouts to the max.
+    print("[STEP 1] Trying PDF sources (direct, Semantic Scholar, arXiv)...")
+    sources = ['direct', 'semantic_scholar', 'arxiv']
+    tasks = [
+        asyncio.create_task(_try_direct_pdf(paper_info, paper_url)),
+        asyncio.create_task(_try_s2_pdf(paper_info, paper_url, title)),
+        asyncio.create_task(_try_arxiv_pdf(paper_info, title, authors)),
+    ]
 
-    print("[INFO] Semantic Scholar PDF not available")
+    text = None
+    pending = set(tasks)
+    results: List[Optional[str]] = [None] * len(tasks)
+    while pending and text is None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            i = tasks.index(task)
+            try:
+                results[i] = task.result()
+            except Exception as e:
+                print(f"[WARN] {sources[i]} PDF attempt failed: {e}")
+
+        # Pick the best finished source, but only once every higher-priority
+        # attempt has also finished (otherwise a slower direct PDF could lose
+        # to a faster arXiv one)
+        for i, task in enumerate(tasks):
+            if not task.done():
+                break
+            if results[i]:
+                text = results[i]
+                print(f"[SUCCESS] Got PDF text from {sources[i]} source")
+                break
+
+    for task in pending:
+        task.cancel()
+
+    if text:
+        paper_info['source_type'] = 'pdf'
+        vectorstore = create_vectorstore_from_text(text, paper_id, paper_info)
+        vector_stores[paper_id] = vectorstore
+        paper_metadata[paper_id] = paper_info
+        return vectorstore, 'pdf'
 
-    # Priority 2: arXiv PDF
-    print("[STEP 2] Trying arXiv PDF...")
-    arxiv_paper = search_arxiv_for_paper(title, authors)
+    print("[INFO] No PDF source available")
 
-    # Check external IDs for arXiv ID
-    if not arxiv_paper:
-        ex = paper_info.get('externalIds') or paper_info.get('external_ids') or {}
-        arxiv_id = ex.get('ArXiv') or ex.get('ARXIV') or ex.get('arxiv')
-        if arxiv_id:
-            arxiv_pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-            arxiv_paper = {'pdf_url': arxiv_pdf_url}
-
-    if arxiv_paper and arxiv_paper.get('pdf_url'):
-        arxiv_pdf_url = arxiv_paper['pdf_url']
-        pdf_content = ArxivService.download_pdf(arxiv_pdf_url)
-
-        if pdf_content:
-            text = extract_text_from_pdf(pdf_content)
-            if text and len(text) > 500:
-                vectorstore = create_vectorstore_from_text(text, paper_id, paper_info)
-                vector_stores[paper_id] = vectorstore
-                paper_metadata[paper_id] = paper_info
-                print("[SUCCESS] Processed arXiv PDF")
-                return vectorstore, 'pdf'
-
-    print("[INFO] arXiv PDF not available")
-
-    # Priority 3: Metadata only
-    print("[STEP 3] Using metadata only (title + abstract)")
+    # Fallback: Metadata only
+    print("[STEP 2] Using metadata only (title + abstract)")
     if abstract:
         metadata_text = f"Title: {title}\n\nAbstract: {abstract}\n\nAuthors: {authors}"
+        paper_info['source_type'] = 'metadata'
         vectorstore = create_vectorstore_from_text(metadata_text, paper_id, paper_info)
         vector_stores[paper_id] = vectorstore
         paper_metadata[paper_id] = paper_info
@@ -272,6 +397,23 @@ def process_paper_with_source_priority(paper_info: Dict, paper_id: str) -> Tuple
     return None, 'no_source'
 
 
+# Query-embedding cache: the same question asked across papers (or asked
+# again) reuses one SBERT forward pass
+_query_vec_cache: Dict[str, List[float]] = {}
+_QUERY_VEC_CACHE_MAX = 1024
+
+
+async def _embed_query_cached(question: str) -> List[float]:
+    """Embed a question, serving repeats from an in-process cache"""
+    vector = _query_vec_cache.get(question)
+    if vector is None:
+        vector = await embeddings.aembed_query(question)
+        if len(_query_vec_cache) >= _QUERY_VEC_CACHE_MAX:
+            _query_vec_cache.pop(next(iter(_query_vec_cache)))
+        _query_vec_cache[question] = vector
+    return vector
+
+
 async def answer_question_with_rag(
     paper_id: str,
     question: str,
@@ -297,15 +439,14 @@ async def answer_question_with_rag(
             paper_info = paper_metadata.get(paper_id) or load_metadata_from_disk(paper_id) or {}
 
         citation = extract_citation_info(paper_info)
-        source_type = 'pdf'  # We'll determine this based on what we stored
-
-        # Check if it's metadata-only by checking document count
-        docs = vectorstore.similarity_search(question, k=1)
-        if docs and len(docs[0].page_content) < 1000:
-            source_type = 'metadata'
+        # Source type was stamped at ingest; no probe query needed
+        source_type = get_source_type(paper_id, paper_info)
 
-        # Retrieve relevant documents using similarity_search
-        relevant_docs = vectorstore.similarity_search(question, k=5)  # Increased to 5 for better context
+        # Retrieve relevant documents; the query embedding is cached so
+        # repeat questions (e.g. the same question across papers) skip the
+        # SBERT forward pass entirely
+        query_vector = await _embed_query_cached(question)
+        relevant_docs = vectorstore.similarity_search_by_vector(query_vector, k=5)
 
         if not relevant_docs:
             return {
@@ -317,66 +458,21 @@ async def answer_question_with_rag(
         # Create context from relevant documents
         context = "\n\n".join([doc.page_content for doc in relevant_docs])
 
-        # Improved prompt for user-friendly answers
-        if source_type == 'pdf':
-            prompt_template = f"""You are PaperLens, a helpful AI research assistant. Your goal is to provide clear, understandable answers based on the research paper.
-
-CONTEXT FROM PAPER:
-{{context}}
-
-USER'S QUESTION:
-{{question}}
-
-INSTRUCTIONS:
-1. Provide a clear, well-structured answer that a general reader can understand
-2. Use simple language when possible, but maintain scientific accuracy
-3. Structure your answer with:
-   - A brief direct answer (1-2 sentences)
-   - Key points or details (2-4 bullet points or short paragraphs)
-   - Any important context or limitations
-4. When referencing the paper, use this citation: {citation}
-5. If the context doesn't fully answer the question, acknowledge this clearly
-6. Keep the answer concise but comprehensive (aim for 150-300 words)
-7. Use examples or analogies if they help explain complex concepts
-
-Answer:"""
-        else:
-            # For metadata-only, be more careful
-            prompt_template = f"""You are PaperLens, a helpful AI research assistant. You're answering based on the paper's abstract and title.
-
-PAPER INFORMATION:
-{{context}}
-
-USER'S QUESTION:
-{{question}}
-
-INSTRUCTIONS:
-1. Provide a helpful answer based on the available information
-2. Be clear about what you can and cannot answer given the limited information
-3. Use simple, understandable language
-4. When referencing, use this citation: {citation}
-5. Keep the answer concise (100-200 words)
-6. If the question requires details not in the abstract, politely explain this
-
-Answer:"""
-
-        PROMPT = PromptTemplate(
-            template=prompt_template,
-            input_variables=["context", "question"]
-        )
-
-        # Create the prompt with context and question
-        formatted_prompt = PROMPT.format(context=context, question=question)
+        # Create the prompt with context, question and citation
+        template = PDF_PROMPT if source_type == 'pdf' else METADATA_PROMPT
+        formatted_prompt = template.format(context=context, question=question, citation=citation)
         
-        # Call LLM directly
-        response = await asyncio.to_thread(llm.invoke, formatted_prompt)
+        # Call LLM on the event loop (no executor thread held per request)
+        response = await llm.ainvoke(formatted_prompt)
         answer = response.strip() if isinstance(response, str) else str(response).strip()
 
-        # Calculate retrieval scores
-        retrieval_scores = []
-        for doc in relevant_docs:
-            score = len(set(question.lower().split()) & set(doc.page_content.lower().split())) / max(len(question.split()), 1)
-            retrieval_scores.append(score)
+        # Calculate retrieval scores (question tokens built once, not per doc)
+        q_tokens = set(question.lower().split())
+        q_len = max(len(q_tokens), 1)
+        retrieval_scores = [
+            len(q_tokens.intersection(doc.page_content.lower().split())) / q_len
+            for doc in relevant_docs
+        ]
 
         # Calculate confidence (keep internal but don't return)
         confidence = ConfidenceScorer.calculate_confidence(
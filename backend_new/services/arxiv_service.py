@@ -1,8 +1,36 @@
 """arXiv API integration service"""
+import io
+import shutil
+from functools import lru_cache
+from itertools import islice
 import requests
-import xml.etree.ElementTree as ET
-import time
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+from typing import Dict, Iterator, List, Optional
+
+# Shared session: keep-alive avoids a TLS handshake per attempt, and the
+# transport-level Retry handles arXiv's 202 "PDF still generating" responses
+# with backoff instead of Python-side sleep loops
+_session = requests.Session()
+_session.headers.update({'User-Agent': 'PaperLens/1.0', 'Accept-Encoding': 'br, gzip, deflate'})
+_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        status_forcelist=[202, 429, 500, 502, 503, 504],
+        backoff_factor=1.5,
+        allowed_methods=['GET']
+    )
+)
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+# Refuse to buffer arbitrarily large bodies
+_MAX_PDF_BYTES = 50 * 1024 * 1024
+
+_ATOM_NS = 'http://www.w3.org/2005/Atom'
 
 
 class ArxivService:
@@ -13,6 +41,14 @@ class ArxivService:
     @staticmethod
     def search_by_title(title: str, max_results: int = 5) -> List[Dict]:
         """Search arXiv by paper title"""
+        feed = ArxivService._fetch_feed(title, max_results)
+        if feed is None:
+            return []
+        return list(islice(ArxivService._iter_arxiv_entries(feed), max_results))
+
+    @staticmethod
+    def _fetch_feed(title: str, max_results: int) -> Optional[bytes]:
+        """Fetch the raw Atom feed for a title search"""
         try:
             clean_title = title.replace('"', '').strip()
 
@@ -23,48 +59,51 @@ class ArxivService:
                 'sortOrder': 'descending'
             }
 
-            response = requests.get(ArxivService.BASE_URL, params=params, timeout=30)
+            response = _session.get(ArxivService.BASE_URL, params=params, timeout=30)
 
             if response.status_code == 200:
-                return ArxivService._parse_arxiv_response(response.text)
+                return response.content
             else:
                 print(f"[WARN] arXiv API returned status {response.status_code}")
-                return []
+                return None
 
         except Exception as e:
             print(f"[ERROR] arXiv search failed: {e}")
-            return []
+            return None
 
     @staticmethod
-    def _parse_arxiv_response(xml_text: str) -> List[Dict]:
-        """Parse arXiv XML response"""
+    def _iter_arxiv_entries(feed: bytes) -> Iterator[Dict]:
+        """
+        Parse arXiv Atom entries incrementally.
+
+        iterparse yields each entry as soon as it closes, so callers that
+        only need the first match stop before the rest of the feed is
+        parsed, and fully-consumed entries are freed as we go.
+        """
         try:
-            root = ET.fromstring(xml_text)
+            context = etree.iterparse(
+                io.BytesIO(feed),
+                events=('end',),
+                tag=f'{{{_ATOM_NS}}}entry'
+            )
 
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'arxiv': 'http://arxiv.org/schemas/atom'
-            }
-
-            papers = []
-
-            for entry in root.findall('atom:entry', ns):
+            for _, entry in context:
                 authors = []
-                for author in entry.findall('atom:author', ns):
-                    name = author.find('atom:name', ns)
+                for author in entry.findall(f'{{{_ATOM_NS}}}author'):
+                    name = author.find(f'{{{_ATOM_NS}}}name')
                     if name is not None and name.text:
                         authors.append(name.text)
 
                 pdf_url = None
-                for link in entry.findall('atom:link', ns):
+                for link in entry.findall(f'{{{_ATOM_NS}}}link'):
                     if link.get('title') == 'pdf':
                         pdf_url = link.get('href')
                         break
 
-                title_elem = entry.find('atom:title', ns)
-                summary_elem = entry.find('atom:summary', ns)
-                published_elem = entry.find('atom:published', ns)
-                arxiv_id_elem = entry.find('atom:id', ns)
+                title_elem = entry.find(f'{{{_ATOM_NS}}}title')
+                summary_elem = entry.find(f'{{{_ATOM_NS}}}summary')
+                published_elem = entry.find(f'{{{_ATOM_NS}}}published')
+                arxiv_id_elem = entry.find(f'{{{_ATOM_NS}}}id')
 
                 paper = {
                     'title': title_elem.text.strip() if title_elem is not None else None,
@@ -76,27 +115,25 @@ class ArxivService:
                     'source': 'arXiv'
                 }
 
-                papers.append(paper)
-
-            return papers
+                entry.clear()
+                yield paper
 
         except Exception as e:
             print(f"[ERROR] Failed to parse arXiv response: {e}")
-            return []
+            return
 
     @staticmethod
-    def download_pdf(pdf_url: str, max_retries: int = 3) -> Optional[bytes]:
-        """Download PDF from arXiv with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(pdf_url, timeout=60)
-
+    def download_pdf(pdf_url: str) -> Optional[bytes]:
+        """Download PDF from arXiv (retries/backoff handled by the session)"""
+        try:
+            with _session.get(pdf_url, stream=True, timeout=(5, 60)) as response:
                 if response.status_code == 200:
-                    return response.content
-                elif response.status_code == 202:
-                    print(f"[INFO] arXiv PDF generating (202), retry {attempt + 1}/{max_retries}")
-                    time.sleep(5 * (attempt + 1))
-                    continue
+                    buf = io.BytesIO()
+                    shutil.copyfileobj(response.raw, buf)
+                    if buf.tell() > _MAX_PDF_BYTES:
+                        print(f"[WARN] arXiv PDF exceeds size limit: {pdf_url}")
+                        return None
+                    return buf.getvalue()
                 elif response.status_code == 404:
                     print(f"[WARN] arXiv PDF not found (404): {pdf_url}")
                     return None
@@ -104,20 +141,18 @@ class ArxivService:
                     print(f"[WARN] arXiv returned status {response.status_code}")
                     return None
 
-            except Exception as e:
-                print(f"[ERROR] arXiv PDF download failed (attempt {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(3)
-
-        return None
+        except Exception as e:
+            print(f"[ERROR] arXiv PDF download failed: {e}")
+            return None
 
 
+@lru_cache(maxsize=4096)
 def search_arxiv_for_paper(title: str, authors: str = None) -> Optional[Dict]:
-    """Search arXiv for a specific paper and return best match"""
-    results = ArxivService.search_by_title(title, max_results=3)
-
-    if not results:
+    """Search arXiv for a specific paper and return best match (memoized)"""
+    feed = ArxivService._fetch_feed(title, max_results=3)
+    if feed is None:
         return None
 
-    return results[0]
+    # Only the top relevance hit matters; stop after the first parsed entry
+    return next(ArxivService._iter_arxiv_entries(feed), None)
 
@@ -1,42 +1,64 @@
 """Paper ranking service using semantic similarity with Sentence Transformers"""
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
 from typing import List, Dict
+from rag.embedding_singleton import get_model
 from utils.text_utils import clean_text
 
-# Load embedding model (reuse same model as RAG for consistency)
-# Using a faster model for ranking
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Shared embedding model (same instance as the RAG pipeline, so the
+# weights are loaded once per process)
+model = get_model()
+
+
+def _keyword_overlap(query: str, abstracts: List[str]) -> np.ndarray:
+    """Count how many distinct query words appear in each abstract"""
+    vocabulary = list(dict.fromkeys(query.lower().split()))
+    if not vocabulary:
+        return np.zeros(len(abstracts), dtype=np.float32)
+    try:
+        counts = CountVectorizer(vocabulary=vocabulary, binary=True).transform(abstracts)
+        return counts.sum(axis=1).A1.astype(np.float32)
+    except ValueError:
+        # Query words may all be stopwords/non-tokens for the vectorizer
+        return np.zeros(len(abstracts), dtype=np.float32)
 
 
 def rank_papers(query: str, papers: List[Dict], top_k: int = 10) -> List[Dict]:
     """Rank papers based on semantic similarity to the query"""
+    if not papers:
+        return []
+
     # Clean query and abstracts
     query = clean_text(query)
-    for paper in papers:
-        paper["abstract"] = clean_text(paper["abstract"] or "")
-
-    # Compute embeddings
-    query_embedding = model.encode([query])
-    paper_embeddings = model.encode([paper["abstract"] for paper in papers])
+    abstracts = [clean_text(paper["abstract"] or "") for paper in papers]
+    for paper, abstract in zip(papers, abstracts):
+        paper["abstract"] = abstract
 
-    # Compute cosine similarity
-    similarities = cosine_similarity(query_embedding, paper_embeddings)[0]
+    # Compute embeddings (encode length-sorts internally, so one wide batch
+    # minimizes padded tokens across the abstracts); normalized vectors make
+    # cosine similarity a plain matrix-vector product
+    query_embedding = model.encode([query], normalize_embeddings=True, convert_to_numpy=True)
+    paper_embeddings = model.encode(abstracts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+    similarities = paper_embeddings @ query_embedding[0]
 
-    # Calculate scores with recency and keyword matching
-    for i, paper in enumerate(papers):
-        year = paper.get("year")
-        recency_weight = 1 + (2025 - year) * 0.01 if year else 1
-        keyword_match = sum(1 for word in query.split() if word.lower() in paper["abstract"].lower())
-        paper["score"] = float(similarities[i]) * recency_weight + keyword_match * 0.1
+    # Recency weight and keyword overlap, fully vectorized
+    years = np.array([int(paper.get("year") or 0) for paper in papers], dtype=np.int32)
+    recency = np.where(years > 0, 1 + (2025 - years) * 0.01, 1.0)
+    keyword_match = _keyword_overlap(query, abstracts)
 
-    # Sort by score
-    ranked_papers = sorted(papers, key=lambda x: x["score"], reverse=True)
+    scores = similarities * recency + keyword_match * 0.1
 
-    # Normalize scores
-    max_score = max(paper["score"] for paper in ranked_papers) if ranked_papers else 1
-    for paper in ranked_papers:
-        paper["score"] = paper["score"] / max_score
+    # Top-k selection in O(N) via argpartition instead of a full sort,
+    # then normalize only the k papers we actually return
+    k = min(top_k, len(papers))
+    top_idx = np.argpartition(-scores, k - 1)[:k]
+    top_idx = top_idx[np.argsort(-scores[top_idx])]
 
-    return ranked_papers[:top_k]
+    max_score = float(scores[top_idx[0]]) or 1.0
+    ranked_papers = []
+    for i in top_idx:
+        paper = papers[i]
+        paper["score"] = float(scores[i]) / max_score
+        ranked_papers.append(paper)
 
+    return ranked_papers
@@ -0,0 +1,64 @@
+"""Ranked search-result cache (Redis when configured, in-memory fallback)"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Ranked results stay valid for 15 minutes; search queries are heavily
+# repeated across users so this skips both the S2 fetch and the ranking pass
+CACHE_TTL_SECONDS = 900
+
+REDIS_URL = os.getenv('REDIS_URL', '')
+_redis = aioredis.from_url(REDIS_URL) if (aioredis and REDIS_URL) else None
+if REDIS_URL and _redis is None:
+    print("[WARN] REDIS_URL set but redis package not installed; using in-memory cache")
+
+# Fallback store: key -> (papers, expires_at)
+_memory_cache: Dict[str, tuple] = {}
+_MAX_MEMORY_ENTRIES = 1024
+
+
+def _cache_key(query: str, limit: int) -> str:
+    normalized = ' '.join(query.lower().split())
+    digest = hashlib.sha1(f"{normalized}|{limit}".encode()).hexdigest()
+    return f"paperlens:search:{digest}"
+
+
+async def get_cached_results(query: str, limit: int) -> Optional[List[Dict]]:
+    """Return cached ranked papers for a query, or None on miss"""
+    key = _cache_key(query, limit)
+    try:
+        if _redis is not None:
+            raw = await _redis.get(key)
+            return json.loads(raw) if raw else None
+
+        cached = _memory_cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        _memory_cache.pop(key, None)
+    except Exception as e:
+        print(f"[WARN] Search cache read failed: {e}")
+    return None
+
+
+async def cache_results(query: str, limit: int, papers: List[Dict]) -> None:
+    """Store ranked papers for a query"""
+    key = _cache_key(query, limit)
+    try:
+        if _redis is not None:
+            await _redis.set(key, json.dumps(papers), ex=CACHE_TTL_SECONDS)
+            return
+
+        if len(_memory_cache) >= _MAX_MEMORY_ENTRIES:
+            now = time.monotonic()
+            for stale in [k for k, (_, expires) in _memory_cache.items() if expires <= now]:
+                _memory_cache.pop(stale, None)
+        _memory_cache[key] = (papers, time.monotonic() + CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"[WARN] Search cache write failed: {e}")
@@ -1,8 +1,118 @@
 """Semantic Scholar API integration service"""
 import asyncio
+import time
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
 from typing import List, Dict, Optional
-import requests
+
+# Shared client so every search reuses pooled connections instead of paying
+# a fresh TCP+TLS handshake per call; HTTP/2 multiplexes concurrent requests.
+# Pool limits are sized for api.semanticscholar.org, the only host we talk to
+_client = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=16, keepalive_expiry=30),
+    http2=True
+)
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called from the app lifespan on shutdown)"""
+    await _client.aclose()
+
+
+# S2's public rate limit is ~1 req/sec unauthenticated; throttling requests
+# up front avoids the 429 + exponential-backoff retry loop entirely
+_limiter = AsyncLimiter(1, 1)
+
+# Global backpressure: a request burst must not fan out into thousands of
+# in-flight S2 tasks that starve the rest of the app
+_s2_semaphore = asyncio.Semaphore(8)
+
+
+class QueryCoalescer:
+    """
+    Coalesce concurrent Semantic Scholar searches.
+
+    Identical (query, limit) pairs submitted while a fetch is in flight
+    share one Future, pending searches are drained in small batched windows
+    and dispatched concurrently under a semaphore, and recent results are
+    served from a short TTL cache without touching the API at all.
+    """
+
+    def __init__(self, max_batch: int = 8, window: float = 0.05, cache_ttl: float = 300):
+        self._max_batch = max_batch
+        self._window = window
+        self._cache_ttl = cache_ttl
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[tuple, asyncio.Future] = {}
+        self._cache: Dict[tuple, tuple] = {}
+        self._semaphore = asyncio.Semaphore(8)
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, query: str, limit: int) -> List[Dict]:
+        """Submit a search, sharing work with identical in-flight queries"""
+        key = (query, limit)
+
+        cached = self._cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            await self._queue.put((key, future))
+            if self._worker is None or self._worker.done():
+                self._worker = asyncio.create_task(self._drain())
+
+        return await asyncio.shield(future)
+
+    async def _drain(self):
+        """Worker loop: collect a batch within the window and dispatch it"""
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), timeout=5)]
+            except asyncio.TimeoutError:
+                return  # queue idle, let the worker exit
+
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await asyncio.gather(*[self._dispatch(key, fut) for key, fut in batch])
+
+    async def _dispatch(self, key: tuple, future: asyncio.Future):
+        """Run one search and resolve its shared Future"""
+        try:
+            async with self._semaphore:
+                results = await SemanticScholarService._fetch_papers(*key)
+            self._prune_cache()
+            self._cache[key] = (results, time.monotonic() + self._cache_ttl)
+            if not future.done():
+                future.set_result(results)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._pending.pop(key, None)
+
+    def _prune_cache(self):
+        """Drop expired cache entries once the cache grows"""
+        if len(self._cache) < 1024:
+            return
+        now = time.monotonic()
+        for key in [k for k, (_, expires) in self._cache.items() if expires <= now]:
+            self._cache.pop(key, None)
+
+
+_coalescer = QueryCoalescer()
 
 
 class SemanticScholarService:
@@ -11,7 +121,31 @@ class SemanticScholarService:
     BASE_URL = "https://api.semanticscholar.org/graph/v1"
 
     @staticmethod
-    async def search_papers(query: str, limit: int = 20, retries: int = 5) -> List[Dict]:
+    def _build_paper_row(p: Dict) -> Dict:
+        """Normalize one S2 API record into the response paper shape"""
+        # Fetch openAccessPdf once instead of hashing the key twice
+        open_access_pdf = p.get("openAccessPdf") or {}
+        return {
+            "title": p.get("title"),
+            "abstract": p.get("abstract"),
+            "authors": ", ".join(a["name"] for a in p.get("authors", [])),
+            "year": p.get("year"),
+            "url": p.get("url"),
+            "pdf_url": open_access_pdf.get("url"),
+            "citation_count": p.get("citationCount", 0),
+            "venue": p.get("venue"),
+            "external_ids": p.get("externalIds", {}),
+            "publication_types": p.get("publicationTypes", []),
+            "open_access": bool(open_access_pdf)
+        }
+
+    @staticmethod
+    async def search_papers(query: str, limit: int = 20) -> List[Dict]:
+        """Search papers, coalescing and caching identical concurrent queries"""
+        return await _coalescer.submit(query, limit)
+
+    @staticmethod
+    async def _fetch_papers(query: str, limit: int = 20, retries: int = 5) -> List[Dict]:
         """Search papers using Semantic Scholar API with retry logic"""
         url = f"{SemanticScholarService.BASE_URL}/paper/search"
         params = {
@@ -21,45 +155,72 @@ class SemanticScholarService:
         }
 
         delay = 5
-        async with httpx.AsyncClient(timeout=30) as client:
-            for attempt in range(retries):
-                try:
-                    response = await client.get(url, params=params)
-                    if response.status_code == 200:
-                        data = response.json()
-                        papers = [
-                            {
-                                "title": p.get("title"),
-                                "abstract": p.get("abstract"),
-                                "authors": ", ".join([a["name"] for a in p.get("authors", [])]),
-                                "year": p.get("year"),
-                                "url": p.get("url"),
-                                "pdf_url": (p.get("openAccessPdf") or {}).get("url"),
-                                "citation_count": p.get("citationCount", 0),
-                                "venue": p.get("venue"),
-                                "external_ids": p.get("externalIds", {}),
-                                "publication_types": p.get("publicationTypes", []),
-                                "open_access": bool(p.get("openAccessPdf"))
-                            }
-                            for p in data.get("data", [])
-                        ]
-                        print(f"[DEBUG] Fetched {len(papers)} papers for query: '{query}'")
-                        return papers
-                    elif response.status_code == 429:
-                        print(f"[WARN] Rate limited. Retrying in {delay}s...")
-                        await asyncio.sleep(delay)
-                        delay *= 2
-                    else:
-                        raise Exception(f"Semantic Scholar API error: {response.status_code}")
-                except Exception as e:
-                    print(f"[ERROR] Fetch attempt {attempt + 1} failed: {e}")
-                    await asyncio.sleep(delay)
+        for attempt in range(retries):
+            try:
+                async with _s2_semaphore, _limiter:
+                    response = await _client.get(url, params=params)
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    papers = [
+                        SemanticScholarService._build_paper_row(p)
+                        for p in data.get("data", [])
+                    ]
+                    print(f"[DEBUG] Fetched {len(papers)} papers for query: '{query}'")
+                    return papers
+                elif response.status_code == 429:
+                    # Honor the server's Retry-After if provided
+                    try:
+                        wait = float(response.headers.get('Retry-After', delay))
+                    except (TypeError, ValueError):
+                        wait = delay
+                    print(f"[WARN] Rate limited. Retrying in {wait}s...")
+                    await asyncio.sleep(wait)
                     delay *= 2
+                else:
+                    raise Exception(f"Semantic Scholar API error: {response.status_code}")
+            except Exception as e:
+                print(f"[ERROR] Fetch attempt {attempt + 1} failed: {e}")
+                await asyncio.sleep(1)
 
         raise Exception("Failed to fetch papers after retries")
 
     @staticmethod
-    def get_paper_pdf_url(paper_url: str, external_ids: Optional[Dict] = None, title: str = '') -> Optional[str]:
+    async def _lookup_pdf_url(api_url: str) -> Optional[str]:
+        """Look up openAccessPdf for a specific paper endpoint"""
+        params = {'fields': 'openAccessPdf,externalIds'}
+        async with _s2_semaphore, _limiter:
+            response = await _client.get(api_url, params=params, timeout=15)
+
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            open_access_pdf = data.get('openAccessPdf')
+            if open_access_pdf and open_access_pdf.get('url'):
+                print(f"[INFO] Found Semantic Scholar PDF: {open_access_pdf['url']}")
+                return open_access_pdf['url']
+        return None
+
+    @staticmethod
+    async def _search_pdf_url_by_title(title: str) -> Optional[str]:
+        """Search for a paper by title and return its openAccessPdf URL"""
+        try:
+            api_search = f"{SemanticScholarService.BASE_URL}/paper/search"
+            params = {'query': title.strip(), 'fields': 'openAccessPdf,externalIds', 'limit': 1}
+            async with _s2_semaphore, _limiter:
+                resp = await _client.get(api_search, params=params, timeout=15)
+            if resp.status_code == 200:
+                data = orjson.loads(resp.content)
+                hits = data.get('data') or []
+                if hits:
+                    oapdf = (hits[0].get('openAccessPdf') or {}).get('url')
+                    if oapdf:
+                        print(f"[INFO] Found S2 PDF via search: {oapdf}")
+                        return oapdf
+        except Exception as e:
+            print(f"[WARN] S2 search by title failed: {e}")
+        return None
+
+    @staticmethod
+    async def get_paper_pdf_url(paper_url: str, external_ids: Optional[Dict] = None, title: str = '') -> Optional[str]:
         """Fetch PDF URL from Semantic Scholar for a specific paper"""
         try:
             # Extract paper ID from URL if needed
@@ -71,35 +232,23 @@ class SemanticScholarService:
                 s2_paper_id = parts[-1]
                 api_url = f"{SemanticScholarService.BASE_URL}/paper/{s2_paper_id}"
             else:
-                return None
-
-            params = {'fields': 'openAccessPdf,externalIds'}
-            response = requests.get(api_url, params=params, timeout=15)
+                api_url = None
 
-            if response.status_code == 200:
-                data = response.json()
-                open_access_pdf = data.get('openAccessPdf')
-                if open_access_pdf and open_access_pdf.get('url'):
-                    print(f"[INFO] Found Semantic Scholar PDF: {open_access_pdf['url']}")
-                    return open_access_pdf['url']
+            if not api_url and not title:
+                return None
 
-            # Search by title as fallback
+            # Run the direct lookup and the title-search fallback concurrently,
+            # preferring the direct lookup when both succeed
+            tasks = []
+            if api_url:
+                tasks.append(SemanticScholarService._lookup_pdf_url(api_url))
             if title:
-                try:
-                    api_search = f"{SemanticScholarService.BASE_URL}/paper/search"
-                    params = {'query': title.strip(), 'fields': 'openAccessPdf,externalIds', 'limit': 1}
-                    resp = requests.get(api_search, params=params, timeout=15)
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        hits = data.get('data') or []
-                        if hits:
-                            hit = hits[0]
-                            oapdf = (hit.get('openAccessPdf') or {}).get('url')
-                            if oapdf:
-                                print(f"[INFO] Found S2 PDF via search: {oapdf}")
-                                return oapdf
-                except Exception as e:
-                    print(f"[WARN] S2 search by title failed: {e}")
+                tasks.append(SemanticScholarService._search_pdf_url_by_title(title))
+
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, str) and result:
+                    return result
 
             return None
 
@@ -2,6 +2,9 @@
 import re
 from typing import Dict
 
+# Compiled once; this runs for every RAG answer
+_AUTHOR_SPLIT = re.compile(r'[,;]\s*')
+
 
 def extract_citation_info(paper_info: Dict) -> str:
     """Extract citation string: (Author et al., Year)"""
@@ -11,16 +14,16 @@ def extract_citation_info(paper_info: Dict) -> str:
     if not authors:
         return f"({year})" if year else ""
 
-    # Split by common delimiters
-    author_list = re.split(r',\s*|;\s*', authors)
+    # Split by common delimiters (skip the split when there are none)
+    if ',' in authors or ';' in authors:
+        author_list = _AUTHOR_SPLIT.split(authors)
+    else:
+        author_list = [authors]
     first_author = author_list[0].strip()
 
-    # Extract last name
-    if ',' in first_author:
-        last_name = first_author.split(',')[0].strip()
-    else:
-        name_parts = first_author.split()
-        last_name = name_parts[-1] if name_parts else first_author
+    # Extract last name (delimiters were consumed by the split above)
+    name_parts = first_author.split()
+    last_name = name_parts[-1] if name_parts else first_author
 
     # Format citation
     if len(author_list) > 1:
@@ -1,6 +1,5 @@
 """Confidence scoring system for RAG answers"""
 from typing import List
-import numpy as np
 
 
 class ConfidenceScorer:
@@ -13,6 +12,14 @@ class ConfidenceScorer:
         'gemini_reasoning': 0.3
     }
 
+    # Per-source weights for (source, retrieval, completeness, chunk) scores
+    _WEIGHTS = {
+        'pdf': (0.3, 0.4, 0.2, 0.1),
+        'metadata': (0.4, 0.2, 0.4, 0.0),
+        'gemini_reasoning': (0.5, 0.0, 0.5, 0.0)
+    }
+    _DEFAULT_WEIGHTS = (0.5, 0.0, 0.5, 0.0)
+
     @staticmethod
     def calculate_confidence(
         source_type: str,
@@ -29,7 +36,8 @@ class ConfidenceScorer:
         # Retrieval quality score
         retrieval_score = 0
         if retrieval_scores and len(retrieval_scores) > 0:
-            avg_score = np.mean(retrieval_scores)
+            # Plain sum/len: no NumPy dispatch for a handful of floats
+            avg_score = sum(retrieval_scores) / len(retrieval_scores)
             retrieval_score = min(avg_score * 100, 100)
         else:
             if source_type in ['metadata', 'gemini_reasoning']:
@@ -51,25 +59,10 @@ class ConfidenceScorer:
         if chunks_used > 0:
             chunk_score = min(chunks_used * 20, 100)
 
-        # Weighted combination
-        if source_type == 'pdf':
-            final_score = (
-                source_score * 0.3 +
-                retrieval_score * 0.4 +
-                completeness_score * 0.2 +
-                chunk_score * 0.1
-            )
-        elif source_type == 'metadata':
-            final_score = (
-                source_score * 0.4 +
-                completeness_score * 0.4 +
-                retrieval_score * 0.2
-            )
-        else:
-            final_score = (
-                source_score * 0.5 +
-                completeness_score * 0.5
-            )
+        # Weighted combination via the per-source lookup table
+        weights = ConfidenceScorer._WEIGHTS.get(source_type, ConfidenceScorer._DEFAULT_WEIGHTS)
+        scores = (source_score, retrieval_score, completeness_score, chunk_score)
+        final_score = sum(w * s for w, s in zip(weights, scores))
 
         return int(max(0, min(final_score, 100)))
 
@@ -1,145 +1,589 @@
 """PDF downloading and text extraction utilities"""
-import io
+import asyncio
+import fitz
+import hashlib
+import httpx
+import os
+import random
 import requests
-import PyPDF2
+import sqlite3
+import threading
 import time
-from typing import Optional
-from html.parser import HTMLParser
-from urllib.parse import urljoin, urlparse, parse_qs
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qs
+
+# One pooled session for all sync HTTP here: keep-alive skips the TCP+TLS
+# handshake per call, and transient errors retry at the transport level
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (PaperLens/1.0)',
+    # Landing pages compress ~5x; requests auto-decompresses (brotli dep)
+    'Accept-Encoding': 'br, gzip, deflate'
+})
+_session_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504]
+    )
+)
+_SESSION.mount('https://', _session_adapter)
+_SESSION.mount('http://', _session_adapter)
+
+# Refuse to buffer arbitrarily large bodies
+MAX_PDF_BYTES = 50 * 1024 * 1024
+
+# Origins hosting many PDFs on one host: HTTP/2 multiplexes those GETs
+# over a single TLS connection instead of serializing per keep-alive
+_HTTP2_HOSTS = {'arxiv.org', 'export.arxiv.org', 'openreview.net'}
+_http2_client: Optional[httpx.Client] = None
+
+
+def _get_http2_client() -> httpx.Client:
+    """Return the shared HTTP/2 client, creating it on first use"""
+    global _http2_client
+    if _http2_client is None:
+        _http2_client = httpx.Client(
+            http2=True,
+            timeout=60,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            headers={'User-Agent': 'Mozilla/5.0 (PaperLens/1.0)', 'Accept-Encoding': 'br, gzip, deflate'}
+        )
+    return _http2_client
+
+
+def _http2_eligible(url: str) -> bool:
+    """Route known bulk-PDF origins through the HTTP/2 client"""
+    try:
+        host = urlsplit(url).netloc.lower()
+        return host.removeprefix('www.') in _HTTP2_HOSTS
+    except Exception:
+        return False
+
+# Anchor hrefs pointing at a PDF, matched against raw response bytes
+_HREF_PDF_RE = re.compile(rb'href=["\']([^"\']+\.pdf[^"\']*)', re.IGNORECASE)
+
+# Known landing-page shapes, dispatched in one pass over the URL instead
+# of a substring scan per pattern
+_RESOLVER_RE = re.compile(
+    r'^https?://(?:www\.)?'
+    r'(?:arxiv\.org/abs/(?P<abs_id>[^#?]+)'
+    r'|arxiv\.org/pdf/(?P<pdf_id>[^#?]+)'
+    r'|openreview\.net/forum\?(?P<or_query>[^#]*))',
+    re.IGNORECASE
+)
 
 
 def is_pdf_bytes(data: Optional[bytes]) -> bool:
     """Check if bytes represent a valid PDF"""
+    # startswith is a C-level memcmp: no slice allocation, no try/except
+    return data is not None and data.startswith(b'%PDF')
+
+
+class _RevalidationStore:
+    """
+    Validators from past landing-page fetches, persisted in sqlite.
+
+    Lets resolve_pdf_url send If-None-Match/If-Modified-Since; a 304
+    answer returns the previously resolved PDF URL without transferring
+    the page body again, even across process restarts.
+    """
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resolutions "
+            "(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, resolved TEXT)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[tuple]:
+        """Return (etag, last_modified, resolved) or None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, resolved FROM resolutions WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], resolved: Optional[str]) -> None:
+        """Record validators and the resolution outcome for a URL"""
+        if not (etag or last_modified):
+            return  # nothing to revalidate against later
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, resolved)
+            )
+            self._conn.commit()
+
+
+_revalidation_store: Optional[_RevalidationStore] = None
+
+
+def _get_revalidation_store() -> _RevalidationStore:
+    """Return the shared validator store, creating it on first use"""
+    global _revalidation_store
+    if _revalidation_store is None:
+        _revalidation_store = _RevalidationStore("./vectorstores/url_validators.sqlite3")
+    return _revalidation_store
+
+
+def _normalize_url(url: str) -> str:
+    """Normalize a URL for cache keying (case, tracking params, fragment)"""
     try:
-        return bool(data) and data[:4] == b'%PDF'
+        parts = urlsplit(url.strip())
+        query = '&'.join(
+            param for param in parts.query.split('&')
+            if param and not param.lower().startswith('utm_')
+        )
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
     except Exception:
-        return False
+        return url.strip()
 
 
 def resolve_pdf_url(url: str) -> Optional[str]:
     """Resolve landing page URLs to direct PDF URLs (arXiv, OpenReview)"""
+    if not (url or '').strip():
+        return None
+    # Resolution is deterministic per URL and can cost several HTTP round
+    # trips; dedup repeats (common across paginated search results)
+    return _resolve_pdf_url_cached(_normalize_url(url))
+
+
+def _probe_pdf_candidate(candidate: str) -> bool:
+    """HEAD a candidate link and report whether it serves a PDF"""
     try:
-        u = (url or '').strip()
-        if not u:
-            return None
-        if u.lower().endswith('.pdf'):
-            return u
+        ok = _SESSION.head(candidate, allow_redirects=True, timeout=10)
+        return 'pdf' in (ok.headers.get('Content-Type') or '').lower()
+    except requests.RequestException:
+        return False
+
 
+@lru_cache(maxsize=4096)
+def _resolve_pdf_url_cached(url: str) -> Optional[str]:
+    """Uncached resolution logic behind resolve_pdf_url"""
+    u = url
+    if not u:
+        return None
+    if u.lower().endswith('.pdf'):
+        return u
+
+    # Known landing pages resolve without any HTTP round trip
+    match = _RESOLVER_RE.match(u)
+    if match:
         # arXiv abs -> pdf
-        if 'arxiv.org/abs/' in u:
-            paper_id = u.split('arxiv.org/abs/')[1].split('#')[0].split('?')[0]
-            return f"https://arxiv.org/pdf/{paper_id}.pdf"
+        if match.group('abs_id'):
+            return f"https://arxiv.org/pdf/{match.group('abs_id')}.pdf"
 
         # arXiv /pdf without .pdf
-        if 'arxiv.org/pdf/' in u and not u.lower().endswith('.pdf'):
-            return u + '.pdf'
+        if match.group('pdf_id'):
+            return f"https://arxiv.org/pdf/{match.group('pdf_id')}.pdf"
 
         # OpenReview forum -> pdf?id=
-        if 'openreview.net/forum' in u and 'id=' in u:
-            parsed = urlparse(u)
-            q = parse_qs(parsed.query)
-            pid = q.get('id', [None])[0]
+        if match.group('or_query') is not None:
+            pid = parse_qs(match.group('or_query')).get('id', [None])[0]
             if pid:
                 return f"https://openreview.net/pdf?id={pid}"
 
-        # Follow redirects to a direct PDF
-        try:
-            r = requests.get(u, allow_redirects=True, timeout=25, stream=True)
-            if r.status_code == 200 and 'pdf' in (r.headers.get('Content-Type') or '').lower():
-                return r.url
-        except Exception:
-            pass
+    # Probe with HEAD first: follows redirects and reveals the
+    # Content-Type without transferring any body
+    crawl_needed = True
+    try:
+        r = _SESSION.head(u, allow_redirects=True, timeout=15)
+        content_type = (r.headers.get('Content-Type') or '').lower()
+        if r.status_code == 200 and 'pdf' in content_type:
+            return r.url
+        # Only crawl when the target is (or might be) an HTML page;
+        # servers rejecting HEAD (405 etc.) stay ambiguous
+        crawl_needed = r.status_code >= 400 or 'text/html' in content_type
+    except requests.RequestException:
+        pass
+
+    if not crawl_needed:
+        return None
+
+    # Simple HTML crawl for .pdf links, revalidating against stored
+    # ETag/Last-Modified so an unchanged page costs a 304 and no body
+    validators = None
+    headers = {}
+    try:
+        validators = _get_revalidation_store().get(u)
+        if validators:
+            etag, last_modified, _ = validators
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+    except sqlite3.Error:
+        pass
+
+    try:
+        r2 = _SESSION.get(u, timeout=25, headers=headers or None)
+    except requests.RequestException:
+        return None
+
+    if r2.status_code == 304 and validators:
+        return validators[2] or None
+    # Covers servers that reject HEAD but serve the PDF on GET
+    if r2.status_code == 200 and 'pdf' in (r2.headers.get('Content-Type') or '').lower():
+        return r2.url
+    if r2.status_code == 200 and 'text/html' in (r2.headers.get('Content-Type') or '') and r2.content:
+        # Regex over the raw bytes: no HTML parser state machine and
+        # no decode of the whole page
+        pdf_links = [
+            match.group(1).decode('utf-8', 'ignore')
+            for match in _HREF_PDF_RE.finditer(r2.content)
+        ]
+
+        # Probe candidates concurrently: proceedings pages can list dozens
+        # of .pdf hrefs, and serial HEADs made that the dominant latency
+        resolved = None
+        candidates = list(dict.fromkeys(urljoin(u, href) for href in pdf_links[:16]))
+        if candidates:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = {
+                    executor.submit(_probe_pdf_candidate, candidate): candidate
+                    for candidate in candidates
+                }
+                for future in as_completed(futures):
+                    if future.result():
+                        resolved = futures[future]
+                        for other in futures:
+                            other.cancel()
+                        break
 
-        # Simple HTML crawl for .pdf links
         try:
-            r2 = requests.get(u, timeout=25)
-            if r2.status_code == 200 and 'text/html' in (r2.headers.get('Content-Type') or '') and r2.text:
-                pdf_links = []
-
-                class LinkParser(HTMLParser):
-                    def handle_starttag(self, tag, attrs):
-                        if tag.lower() == 'a':
-                            href = dict(attrs).get('href', '')
-                            if href and '.pdf' in href.lower():
-                                pdf_links.append(href)
-
-                parser = LinkParser()
-                parser.feed(r2.text)
-
-                for href in pdf_links:
-                    candidate = urljoin(u, href)
-                    try:
-                        ok = requests.head(candidate, allow_redirects=True, timeout=15)
-                        if 'pdf' in (ok.headers.get('Content-Type') or '').lower():
-                            return candidate
-                    except Exception:
-                        continue
-        except Exception:
+            _get_revalidation_store().put(
+                u, r2.headers.get('ETag'), r2.headers.get('Last-Modified'), resolved
+            )
+        except sqlite3.Error:
             pass
+        return resolved
 
-        return None
-    except Exception:
-        return None
+    return None
+
+
+# Invalidation hooks on the public name (mirror lru_cache's interface)
+resolve_pdf_url.cache_clear = _resolve_pdf_url_cached.cache_clear
+resolve_pdf_url.cache_info = _resolve_pdf_url_cached.cache_info
+
+
+def _read_body(response) -> bytes:
+    """
+    Read a streamed response body, preallocating from Content-Length.
+
+    response.content accumulates chunks in a list and joins them, briefly
+    doubling memory for large PDFs; writing into one bytearray avoids the
+    concat. Falls back to response.content when the length is unknown.
+    """
+    try:
+        content_length = int(response.headers.get('Content-Length', 0))
+    except (TypeError, ValueError):
+        content_length = 0
+    if content_length <= 0:
+        return response.content
+
+    buf = bytearray(content_length)
+    view = memoryview(buf)
+    offset = 0
+    chunks = response.iter_content(65536)
+    for chunk in chunks:
+        end = offset + len(chunk)
+        if end > content_length:
+            # Decoded body longer than advertised (Content-Length counts the
+            # compressed wire bytes when the response is content-encoded);
+            # keep draining iter_content so the remainder stays decompressed
+            parts = [bytes(buf[:offset]), chunk]
+            parts.extend(chunks)
+            return b''.join(parts)
+        view[offset:end] = chunk
+        offset = end
+    return bytes(buf) if offset == content_length else bytes(buf[:offset])
+
+
+def _retry_sleep(attempt: int) -> None:
+    """Exponential backoff with jitter, so retries don't synchronize"""
+    time.sleep(min(30, 2 ** attempt) + random.random() * 0.5)
 
 
 def download_pdf(url: str, max_retries: int = 3) -> Optional[bytes]:
     """Download PDF with retry logic and status code handling"""
+    use_http2 = _http2_eligible(url)
     for attempt in range(max_retries):
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (PaperLens/1.0)'}
-            response = requests.get(url, timeout=60, allow_redirects=True, headers=headers, stream=True)
+            if use_http2:
+                client = _get_http2_client()
+                response = client.send(client.build_request("GET", url), stream=True)
+            else:
+                response = _SESSION.get(url, timeout=60, allow_redirects=True, stream=True)
 
             if response.status_code == 200:
-                content_type = response.headers.get('Content-Type', '')
-                raw_bytes = response.content if response.content else response.raw.read()
-                if 'pdf' in content_type.lower() or url.lower().endswith('.pdf') or is_pdf_bytes(raw_bytes):
+                content_type = (response.headers.get('Content-Type') or '').lower()
+                try:
+                    content_length = int(response.headers.get('Content-Length', 0))
+                except (TypeError, ValueError):
+                    content_length = 0
+
+                # Decide from the headers before buffering anything
+                if content_length > MAX_PDF_BYTES:
+                    print(f"[WARN] PDF exceeds size limit ({content_length} bytes): {url}")
+                    response.close()
+                    return None
+                if 'html' in content_type and not url.lower().endswith('.pdf'):
+                    print(f"[WARN] URL returned non-PDF content: {content_type}")
+                    response.close()
+                    return None
+
+                raw_bytes = response.read() if use_http2 else _read_body(response)
+                if len(raw_bytes) > MAX_PDF_BYTES:
+                    print(f"[WARN] PDF exceeds size limit: {url}")
+                    return None
+                if 'pdf' in content_type or url.lower().endswith('.pdf') or is_pdf_bytes(raw_bytes):
                     return raw_bytes
                 else:
                     print(f"[WARN] URL returned non-PDF content: {content_type}")
                     return None
 
             elif response.status_code == 202:
-                wait_time = 5 * (attempt + 1)
-                print(f"[INFO] PDF processing (202), waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                time.sleep(wait_time)
+                print(f"[INFO] PDF processing (202), backing off before retry {attempt + 1}/{max_retries}")
+                response.close()
+                _retry_sleep(attempt)
                 continue
 
             elif response.status_code == 404:
                 print(f"[WARN] PDF not found (404): {url}")
+                response.close()
                 return None
 
             else:
                 print(f"[WARN] Unexpected status code {response.status_code} for {url}")
+                response.close()
                 return None
 
-        except requests.exceptions.Timeout:
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                httpx.TimeoutException, httpx.TransportError):
             print(f"[WARN] Timeout downloading PDF (attempt {attempt + 1})")
             if attempt < max_retries - 1:
-                time.sleep(3)
-        except Exception as e:
+                _retry_sleep(attempt)
+        except (requests.RequestException, httpx.HTTPError) as e:
             print(f"[ERROR] Failed to download PDF (attempt {attempt + 1}): {e}")
             if attempt < max_retries - 1:
-                time.sleep(3)
+                _retry_sleep(attempt)
 
     return None
 
 
-def extract_text_from_pdf(pdf_content: bytes) -> str:
-    """Extract text from PDF bytes"""
-    try:
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+# Shared async client for batch downloads; rebuilt lazily if a previous
+# event loop closed it
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=60,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+            headers={'User-Agent': 'Mozilla/5.0 (PaperLens/1.0)'}
+        )
+    return _async_client
+
 
-        text = ""
-        for page in pdf_reader.pages:
+async def _download_pdf_async(client: httpx.AsyncClient, sem: asyncio.Semaphore, url: str, max_retries: int = 3) -> Optional[bytes]:
+    """Async single-PDF download with the same status handling as download_pdf"""
+    async with sem:
+        for attempt in range(max_retries):
             try:
-                page_text = page.extract_text()
-            except Exception:
-                page_text = None
-            if page_text:
-                text += page_text + "\n"
+                response = await client.get(url)
+
+                if response.status_code == 200:
+                    content_type = response.headers.get('Content-Type', '')
+                    raw_bytes = response.content
+                    if 'pdf' in content_type.lower() or url.lower().endswith('.pdf') or is_pdf_bytes(raw_bytes):
+                        return raw_bytes
+                    print(f"[WARN] URL returned non-PDF content: {content_type}")
+                    return None
+
+                elif response.status_code == 202:
+                    wait_time = 5 * (attempt + 1)
+                    print(f"[INFO] PDF processing (202), waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
+                    await asyncio.sleep(wait_time)
+                    continue
+
+                elif response.status_code == 404:
+                    print(f"[WARN] PDF not found (404): {url}")
+                    return None
+
+                else:
+                    print(f"[WARN] Unexpected status code {response.status_code} for {url}")
+                    return None
+
+            except Exception as e:
+                print(f"[ERROR] Failed to download PDF (attempt {attempt + 1}): {e}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(3)
+
+        return None
+
+
+async def download_pdfs(urls: List[str], concurrency: int = 16) -> List[Optional[bytes]]:
+    """
+    Download many PDFs concurrently.
+
+    Fetches overlap on one event loop with a semaphore bounding in-flight
+    requests, so N downloads take roughly the time of the slowest batch
+    instead of the sum. Results align with the input order; failures come
+    back as None like the sync version.
+    """
+    client = _get_async_client()
+    sem = asyncio.Semaphore(concurrency)
+    return list(await asyncio.gather(*[_download_pdf_async(client, sem, url) for url in urls]))
+
+
+# Extracted text keyed by content hash: duplicate PDFs across searches
+# (same paper from different pages/sources) skip the parse entirely
+_PDF_TEXT_CACHE_DIR = Path("./vectorstores/pdftext")
+_pdf_text_memory_cache: Dict[str, str] = {}
+_PDF_TEXT_MEMORY_MAX = 64
+
+
+def _remember_pdf_text(content_hash: str, text: str) -> None:
+    """Keep a small in-process map of recently extracted texts"""
+    if len(_pdf_text_memory_cache) >= _PDF_TEXT_MEMORY_MAX:
+        _pdf_text_memory_cache.pop(next(iter(_pdf_text_memory_cache)))
+    _pdf_text_memory_cache[content_hash] = text
+
+
+def extract_text_from_pdf(pdf_content: bytes, use_cache: bool = True) -> str:
+    """Extract text from PDF bytes (cached by content hash)"""
+    if not use_cache:
+        return _extract_pdf_text(pdf_content)
+
+    content_hash = hashlib.blake2b(pdf_content, digest_size=16).hexdigest()
+    cached = _pdf_text_memory_cache.get(content_hash)
+    if cached is not None:
+        return cached
+
+    cache_path = _PDF_TEXT_CACHE_DIR / f"{content_hash}.txt"
+    try:
+        if cache_path.exists():
+            text = cache_path.read_text(encoding='utf-8')
+            _remember_pdf_text(content_hash, text)
+            return text
+    except Exception as e:
+        print(f"[WARN] Failed to read PDF text cache: {e}")
+
+    text = _extract_pdf_text(pdf_content)
+    if text:
+        try:
+            _PDF_TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"[WARN] Failed to write PDF text cache: {e}")
+        _remember_pdf_text(content_hash, text)
+    return text
+
+
+def iter_pdf_pages(pdf_content: bytes) -> Iterator[str]:
+    """
+    Yield the text of each page as it is parsed.
+
+    Lets chunking/embedding consume pages as a pipeline without holding
+    the whole document's text in memory at once.
+    """
+    if not is_pdf_bytes(pdf_content):
+        return
+    try:
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        try:
+            for page in doc:
+                yield page.get_text("text")
+        finally:
+            doc.close()
+    except Exception as e:
+        print(f"[ERROR] PDF page iteration failed: {e}")
+
+
+# Page extraction shards across processes for large PDFs; small ones
+# aren't worth the fork/pickle overhead
+_PAGE_POOL_THRESHOLD = 8
+_page_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_fitz() -> None:
+    """Prime MuPDF's font tables so a worker's first real page isn't slow"""
+    try:
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 72), "warmup")
+        page.get_text("text")
+        doc.close()
+    except Exception:
+        pass
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Return the shared page-extraction pool, creating it on first use"""
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_warm_fitz)
+    return _page_pool
+
+
+def _extract_page_range(pdf_content: bytes, start: int, end: int) -> str:
+    """Worker: open an own fitz document and extract pages [start, end)"""
+    doc = fitz.open(stream=pdf_content, filetype="pdf")
+    try:
+        return "\n".join(doc[i].get_text("text") for i in range(start, end))
+    finally:
+        doc.close()
+
+
+def _extract_pdf_text(pdf_content: bytes) -> str:
+    """Uncached PDF text extraction"""
+    # Cheap byte scans before handing the blob to MuPDF: a bad magic or a
+    # truncated tail would otherwise trigger an expensive failed parse
+    if not is_pdf_bytes(pdf_content):
+        print("[WARN] Skipping extraction: content is not a PDF")
+        return ""
+    if pdf_content.rfind(b'%%EOF', max(0, len(pdf_content) - 1024)) == -1:
+        print("[WARN] Skipping extraction: PDF is truncated (no %%EOF near tail)")
+        return ""
+
+    try:
+        # PyMuPDF parses in C over MuPDF; "text" mode preserves reading order
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        try:
+            page_count = doc.page_count
+            if page_count <= _PAGE_POOL_THRESHOLD:
+                return "\n".join(page.get_text("text") for page in doc).strip()
+        finally:
+            doc.close()
 
-        return text.strip()
+        # Large PDF: shard contiguous page ranges across worker processes
+        workers = min(os.cpu_count() or 1, page_count)
+        per_worker = -(-page_count // workers)  # ceil division
+        pool = _get_page_pool()
+        futures = [
+            pool.submit(_extract_page_range, pdf_content, start, min(start + per_worker, page_count))
+            for start in range(0, page_count, per_worker)
+        ]
+        return "\n".join(future.result() for future in futures).strip()
     except Exception as e:
         print(f"[ERROR] PDF text extraction failed: {e}")
         return ""
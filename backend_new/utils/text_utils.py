@@ -2,14 +2,16 @@
 import re
 from typing import List
 
+# Citations like [1], [2,3], etc. Compiled once; [^\]]* avoids the
+# backtracking that the lazy .*? form pays on every bracket
+_CITATION_RE = re.compile(r'\[[^\]]*\]')
+
 
 def clean_text(text: str) -> str:
     """Clean text by removing citations and special characters"""
     if not text:
         return ""
-    # Remove citations like [1], [2,3], etc.
-    text = re.sub(r'\[.*?\]', '', text)
-    return text.strip()
+    return _CITATION_RE.sub('', text).strip()
 
 
 def split_text_into_chunks(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
@@ -17,18 +19,52 @@ def split_text_into_chunks(text: str, chunk_size: int = 1000, overlap: int = 200
     if not text:
         return []
 
+    # Precompute all window offsets and strip each chunk exactly once
+    stripped = (
+        text[start:start + chunk_size].strip()
+        for start in range(0, len(text), chunk_size - overlap)
+    )
+    return [chunk for chunk in stripped if chunk]
+
+
+def fast_split(text: str, size: int = 1000, overlap: int = 200) -> List[str]:
+    """
+    Split text into overlapping chunks at natural boundaries, single pass.
+
+    Prefers a paragraph break, then a sentence break, inside the tail of
+    each window; falls back to a hard cut. O(N) in text length, unlike
+    the recursive re-scanning splitters.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= size:
+        return [text]
+
     chunks = []
     start = 0
-    text_length = len(text)
-
-    while start < text_length:
-        end = start + chunk_size
-        chunk = text[start:end]
+    n = len(text)
+    while start < n:
+        end = start + size
+        if end >= n:
+            tail = text[start:].strip()
+            if tail:
+                chunks.append(tail)
+            break
 
-        if chunk.strip():
-            chunks.append(chunk.strip())
+        # Look for a boundary in the last `overlap` chars of the window
+        cut = text.rfind('\n\n', start + size - overlap, end)
+        if cut == -1:
+            cut = text.rfind('. ', start + size - overlap, end)
+            if cut != -1:
+                cut += 1  # keep the period with the chunk
+        if cut == -1:
+            cut = end
 
-        start += (chunk_size - overlap)
+        chunk = text[start:cut].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = max(cut - overlap, start + 1)
 
     return chunks
 